@@ -0,0 +1,165 @@
+"""
+Benchmarks de escala da normalização e da análise fatorial com dados sintéticos
+
+Cada caso (etapa × tamanho) roda em um subprocesso próprio, para que o pico
+de RSS reportado seja só daquele caso. Etapas:
+
+- resolve: resolução de distritos (normalize_row, sem chamadas ao Nominatim)
+- merge:   junção com os dados socioeconômicos e limpeza, como no notebook
+- factor:  FactorAnalyzer (4 fatores, método principal), como no notebook
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import SyntheticPlaces
+
+STAGES = ["resolve", "merge", "factor"]
+SOCIO_COLS = ["renda", "quota", "escolaridade", "idade", "mortalidade", "txcresc", "causasext", "favel", "denspop"]
+METRIC_COLS = ["rating", "total_ratings", "photos_count", "reviews_count"]
+COMMA_COLS = ["quota", "escolaridade", "mortalidade", "txcresc", "causasext", "favel", "denspop"]
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def load_socio(path: str) -> pd.DataFrame:
+    socio = pd.read_csv(path, sep=";", encoding="utf-8-sig")
+    socio["distrito"] = socio["distrito"].str.lower().str.strip()
+    return socio
+
+
+def merge_socio(df: pd.DataFrame, socio: pd.DataFrame) -> pd.DataFrame:
+    """
+    Junção com os dados socioeconômicos e seleção das variáveis numéricas (células 7-12 do notebook)
+    """
+    df["distrito_old"] = df["distrito"]
+    df["distrito"] = df["distrito_atualizado"].str.lower().str.strip()
+    merged = df.merge(socio, on="distrito", how="inner")
+
+    numeric = merged[METRIC_COLS + SOCIO_COLS].copy()
+    numeric[COMMA_COLS] = numeric[COMMA_COLS].replace(",", ".", regex=True).astype(float).round(2)
+    return numeric.apply(pd.to_numeric, errors="coerce").dropna()
+
+
+def run_case(stage: str, rows: int, socio_path: str, chunk_size: int) -> dict:
+    """
+    Executa uma etapa com `rows` registros sintéticos; só a etapa é cronometrada
+    """
+    gen = SyntheticPlaces(normalized=stage != "resolve")
+    elapsed = 0.0
+    baseline = None
+
+    if stage == "resolve":
+        from normalize_data import normalize_row
+        today = datetime.today()
+        # Gerado em blocos: o pico de RSS reflete a etapa, não o volume total
+        for df in gen.frames(rows, chunk_size):
+            records = df.to_dict("records")
+            baseline = baseline or _peak_rss_mb()
+            start = time.perf_counter()
+            for row in records:
+                normalize_row(row, {}, False, 0, today)
+            elapsed += time.perf_counter() - start
+    else:
+        socio = load_socio(socio_path)
+        df = pd.concat(gen.frames(rows, chunk_size), ignore_index=True)
+        if stage == "factor":
+            df = merge_socio(df, socio)
+        baseline = _peak_rss_mb()
+        start = time.perf_counter()
+        if stage == "merge":
+            merge_socio(df, socio)
+        else:
+            from factor_analyzer import FactorAnalyzer
+            FactorAnalyzer(n_factors=4, method="principal", rotation=None).fit(df)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "stage": stage,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "baseline_rss_mb": round(baseline or 0, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def scaling_exponent(results: pd.DataFrame) -> pd.Series:
+    """
+    Inclinação log-log de tempo × linhas por etapa (1 = linear)
+    """
+    def slope(g):
+        g = g.dropna(subset=["seconds"])
+        g = g[g["seconds"] > 0]
+        if len(g) < 2:
+            return np.nan
+        return np.polyfit(np.log(g["rows"]), np.log(g["seconds"]), 1)[0]
+    return results.groupby("stage").apply(slope, include_groups=False).round(2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1e3,1e4,1e5", help="Tamanhos separados por vírgula (ex.: 1e3,1e4,1e5,1e6,1e7)")
+    ap.add_argument("--stages", default=",".join(STAGES), help="Etapas: " + ", ".join(STAGES))
+    ap.add_argument("--socio-csv", default="base/dados_distrito_sp_2015.csv", help="Dados socioeconômicos por distrito")
+    ap.add_argument("--chunk-size", type=int, default=100_000, help="Registros por bloco gerado")
+    ap.add_argument("--timeout", type=float, default=3600, help="Tempo máximo (s) por caso; tamanhos maiores da etapa são pulados")
+    ap.add_argument("--output", default=None, help="CSV com os resultados")
+    ap.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--rows", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    # Subprocesso: executa um único caso e imprime o resultado em JSON
+    if args.case:
+        print(json.dumps(run_case(args.case, args.rows, args.socio_csv, args.chunk_size)))
+        return
+
+    stages = [s.strip() for s in args.stages.split(",")]
+    if any(s in ("merge", "factor") for s in stages) and not Path(args.socio_csv).exists():
+        ap.error(f"{args.socio_csv} não encontrado (descompacte base.zip ou use --socio-csv)")
+
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    results = []
+    for stage in stages:
+        for rows in sizes:
+            cmd = [sys.executable, __file__, "--case", stage, "--rows", str(rows),
+                   "--socio-csv", args.socio_csv, "--chunk-size", str(args.chunk_size)]
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"⏱️ {stage} {rows:>10}: excedeu {args.timeout:.0f}s, pulando tamanhos maiores")
+                break
+            if proc.returncode != 0:
+                print(f"❌ {stage} {rows:>10}: {proc.stderr.strip().splitlines()[-1]}")
+                break
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{stage:<8} {rows:>10} linhas: {result['seconds']:>9.3f}s  "
+                  f"{result['rows_per_s'] or 0:>12,.0f} linhas/s  pico RSS {result['peak_rss_mb']:>8.1f} MB")
+
+    if not results:
+        return
+    df = pd.DataFrame(results)
+    print("\nExpoente de escala (log tempo × log linhas; 1 = linear):")
+    for stage, exp in scaling_exponent(df).items():
+        print(f"  - {stage}: {exp}")
+    if args.output:
+        df.to_csv(args.output, index=False, encoding="utf-8")
+        print(f"Resultados salvos em: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
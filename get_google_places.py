@@ -4,6 +4,7 @@ usando Google Places API
 """
 
 import os
+import argparse
 import requests
 import json
 import time
@@ -14,14 +15,38 @@ from dotenv import load_dotenv
 from datetime import datetime
 from loguru import logger 
 
+from query_planner import COUNTED_STATUSES, QueryPlanner
+from raw_archive import RawArchive, open_archives
+from opening_hours import encode_periods
+
 # Carrega variáveis do arquivo .env
 load_dotenv()
 LOCAL = os.getenv('ASK_THEME')
 
+# Áreas do Nearby Search (centro, zonas e cidades vizinhas)
+SEARCH_AREAS = [
+    {"name": "Centro/Sé", "lat": -23.5505, "lng": -46.6333, "radius": 8000},
+    {"name": "Zona Sul", "lat": -23.6094, "lng": -46.6927, "radius": 8000},
+    {"name": "Zona Norte", "lat": -23.4858, "lng": -46.6311, "radius": 8000},
+    {"name": "Zona Oeste", "lat": -23.5280, "lng": -46.7425, "radius": 8000},
+    {"name": "Zona Leste", "lat": -23.5629, "lng": -46.5477, "radius": 8000},
+    {"name": "ABC Paulista", "lat": -23.6648, "lng": -46.5348, "radius": 10000},
+    {"name": "Guarulhos", "lat": -23.4543, "lng": -46.5339, "radius": 8000},
+    {"name": "Osasco", "lat": -23.5329, "lng": -46.7918, "radius": 8000},
+]
+
 class DataCollector:
-    def __init__(self):
-        self.api_key = os.getenv('GOOGLE_API_KEY')
-        if not self.api_key:
+    def __init__(self, planner: Optional[QueryPlanner] = None, archive: Optional[RawArchive] = None,
+                 offline: bool = False, api_key: Optional[str] = None):
+        """
+        Args:
+            planner: Planejador das consultas por distrito
+            archive: Arquivo das respostas brutas da API
+            offline: Se True, não exige GOOGLE_API_KEY (ex.: reconstrução a partir do arquivo)
+            api_key: Chave da API (padrão: GOOGLE_API_KEY do .env)
+        """
+        self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
+        if not self.api_key and not offline:
             raise ValueError("GOOGLE_API_KEY não encontrada no arquivo .env")
         
         self.base_url = "https://maps.googleapis.com/maps/api/place"
@@ -37,6 +62,25 @@ class DataCollector:
         self.radius = 50000
         
         self.results = []
+        
+        # Estatísticas de rendimento das consultas persistidas entre execuções
+        self.planner = planner or QueryPlanner(os.getenv('QUERY_STATS_FILE', f"{LOCAL}_query_stats.json"))
+        
+        # Respostas brutas preservadas para reprocessamento offline
+        self.archive = archive
+        
+        # Chamadas que falharam (rede, cota, chave, status diferente de OK)
+        self.failed_calls = 0
+    
+    def _archive(self, kind: str, key: str, payload: Dict):
+        """
+        Grava a resposta bruta no arquivo, se configurado
+        """
+        if self.archive is not None and payload:
+            try:
+                self.archive.append(kind, key, payload)
+            except OSError as e:
+                print(f"Erro ao arquivar resposta ({kind} {key}): {e}")
     
     def search_nearby_places(self, location: Dict[str, float], radius: int, 
                            keyword: str = LOCAL, next_page_token: Optional[str] = None) -> Dict:
@@ -59,7 +103,9 @@ class DataCollector:
         try:
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            self._archive('nearbysearch', next_page_token or f"{params['location']}|{radius}|{keyword}", result)
+            return result
         except requests.exceptions.RequestException as e:
             print(f"Erro na requisição: {e}")
             return {}
@@ -111,8 +157,15 @@ class DataCollector:
         try:
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json().get('result', {})
+            result = response.json()
+            self._archive('details', place_id, result)
+            if result.get('status') != 'OK':
+                self.failed_calls += 1
+                print(f"Falha ao obter detalhes do lugar {place_id}: {result.get('status', 'sem resposta')}")
+                return {}
+            return result.get('result', {})
         except requests.exceptions.RequestException as e:
+            self.failed_calls += 1
             print(f"Erro ao obter detalhes do lugar {place_id}: {e}")
             return {}
     
@@ -132,7 +185,9 @@ class DataCollector:
         try:
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            self._archive('textsearch', query, result)
+            return result
         except requests.exceptions.RequestException as e:
             print(f"Erro na busca por texto: {e}")
             return {}
@@ -226,147 +281,194 @@ class DataCollector:
         
         return 'Não Identificado'
     
-    def collect_all_local(self) -> List[Dict]:
+    def district_list(self) -> List[str]:
         """
-        Coleta todos os dados dos locais em São Paulo usando múltiplas estratégias
-        para superar o limite de 60 resultados do Nearby Search
+        Distritos de busca do arquivo .env (ou uma lista básica de fallback)
         """
-        print(f"Iniciando busca abrangente por {LOCAL} em São Paulo...")
-        all_places = {}  # Usar dict para evitar duplicatas por place_id
-        
-        # ESTRATÉGIA 1: Text Search por Distritos de São Paulo
-        print("\n=== ESTRATÉGIA 1: Text Search por Distritos ===")
-        
-        # Buscar distritos do arquivo .env
         distritos_env = os.getenv('DISTRITOS_SP', '')
         
         if distritos_env:
             # Converter string em lista e limpar espaços
-            distritos_list = [distrito.strip() for distrito in distritos_env.split(',')]
-            print(f"📍 Carregados {len(distritos_list)} distritos de São Paulo do .env")
-        else:
-            # Fallback para lista básica se não encontrar no .env
-            distritos_list = [
-                "Centro São Paulo", "Zona Sul São Paulo", "Zona Norte São Paulo",
-                "Zona Oeste São Paulo", "Zona Leste São Paulo", f"{LOCAL} São Paulo"
-            ]
-            print("⚠️ DISTRITOS_SP não encontrada no .env, usando busca básica")
-        
-        # Criar queries otimizadas para cada distrito
-        text_queries = []
-        for distrito in distritos_list:
-            # Múltiplas variações para cada distrito
-            text_queries.extend([
-                f"{LOCAL} {distrito} São Paulo",
-                f"{LOCAL} {distrito} São Paulo SP",
-            ])
+            return [distrito.strip() for distrito in distritos_env.split(',')]
         
-        print(f"🔍 Executando {len(text_queries)} buscas específicas por distrito...")
+        # Fallback para lista básica se não encontrar no .env
+        return [
+            "Centro São Paulo", "Zona Sul São Paulo", "Zona Norte São Paulo",
+            "Zona Oeste São Paulo", "Zona Leste São Paulo", f"{LOCAL} São Paulo"
+        ]
+    
+    def search_district(self, distrito: str, all_places: Dict, label: str = "",
+                        progress: Optional[Dict] = None) -> int:
+        """
+        Executa as buscas por texto de um distrito conforme o planejador e
+        adiciona os novos locais em all_places; retorna quantos foram novos
         
-        for i, query in enumerate(text_queries, 1):
-            print(f"Buscando ({i}/{len(text_queries)}): {query}")
-            search_result = self.text_search_places(query)
+        Args:
+            progress: Estado da busca, atualizado no lugar: templates concluídos e,
+                para cada template que falhou, a página e o next_page_token de onde
+                retomar. Passando o mesmo dicionário de novo, a busca continua do
+                ponto da falha, sem repetir as chamadas que já deram certo
+        """
+        planner = self.planner
+        initial_count = len(all_places)
+        progress = {} if progress is None else progress
+        done = progress.setdefault('done', [])
+        pending = progress.setdefault('resume', {})
+        
+        for n, template in enumerate(planner.order_templates(distrito)):
+            if template in done:
+                continue
+            query = template.format(local=LOCAL, distrito=distrito)
+            resume = pending.pop(template, None)
             
-            if 'results' in search_result:
-                results_found = 0
-                for place in search_result['results']:
-                    if place['place_id'] not in all_places:
-                        all_places[place['place_id']] = place
-                        results_found += 1
-                
-                print(f"  → {results_found} novos {LOCAL} encontrados")
-                
-                # Busca páginas adicionais se disponível
-                next_page_token = search_result.get('next_page_token')
-                page = 2
-                
-                while next_page_token and page <= 3:  # Limitar a 3 páginas por distrito
+            if resume is None:
+                # Variantes são quase idênticas: se uma consulta anterior já
+                # retornou o conjunto completo (sem próxima página), não repete
+                if progress.get('exhausted') or not planner.should_query(template, distrito, primary=(n == 0)):
+                    print(f"  ⏭️ Pulando {label}: {query}")
+                    done.append(template)
+                    continue
+                page, next_page_token = 1, None
+            else:
+                # Retomada após uma falha: a página que falhou é buscada sem
+                # passar pelo rendimento, que já foi avaliado na tentativa anterior
+                page, next_page_token = resume['page'], resume['token']
+                print(f"Retomando {label}: {query} (página {page})")
+            
+            page_new = None
+            failed = False
+            while page == 1 or (next_page_token and (page_new is None or
+                                                     planner.should_continue(template, distrito, page, page_new))):
+                if page == 1:
+                    print(f"Buscando {label}: {query}")
+                    page_result = self.text_search_places(query)
+                else:
                     print(f"    Página {page}...")
                     time.sleep(2)  # Delay obrigatório para next_page_token
-                    
                     params = {'key': self.api_key, 'pagetoken': next_page_token}
                     try:
                         response = self.session.get(f"{self.base_url}/textsearch/json", params=params)
                         page_result = response.json()
-                        
-                        if 'results' in page_result:
-                            page_results_found = 0
-                            for place in page_result['results']:
-                                if place['place_id'] not in all_places:
-                                    all_places[place['place_id']] = place
-                                    page_results_found += 1
-                            
-                            if page_results_found > 0:
-                                print(f"    → +{page_results_found} {LOCAL} adicionais")
-                        
-                        next_page_token = page_result.get('next_page_token')
-                        page += 1
+                        self._archive('textsearch', next_page_token, page_result)
                     except Exception as e:
                         print(f"    Erro na página {page}: {e}")
-                        break
-            else:
-                print(f"  → Nenhum resultado para {query}")
+                        page_result = {'status': 'sem resposta'}
+                
+                # Falhas (rede, cota, chave) não dizem nada sobre o rendimento da consulta
+                if page_result.get('status') not in COUNTED_STATUSES:
+                    planner.record_failure()
+                    self.failed_calls += 1
+                    print(f"  → Falha na página {page} ({page_result.get('status', 'sem resposta')}): {query}")
+                    pending[template] = {'page': page, 'token': next_page_token}
+                    failed = True
+                    break
+                
+                page_new = self._add_new_places(all_places, page_result.get('results', []))
+                planner.record(template, distrito, page, page_new)
+                if page == 1:
+                    print(f"  → {page_new} novos {LOCAL} encontrados")
+                elif page_new > 0:
+                    print(f"    → +{page_new} {LOCAL} adicionais")
+                
+                next_page_token = page_result.get('next_page_token')
+                if page == 1:
+                    progress['exhausted'] = not next_page_token
+                page += 1
+            
+            if not failed:
+                done.append(template)
             
             # Delay entre queries para evitar rate limiting
             time.sleep(0.5)
         
+        return len(all_places) - initial_count
+    
+    def search_area(self, area: Dict, all_places: Dict) -> int:
+        """
+        Executa o Nearby Search de uma área (até 3 páginas) e adiciona os
+        novos locais em all_places; retorna quantos foram novos
+        """
+        print(f"Buscando na {area['name']}...")
+        
+        search_result = self.search_nearby_places(
+            {"lat": area["lat"], "lng": area["lng"]}, 
+            area["radius"], 
+            LOCAL
+        )
+        
+        new_places = 0
+        if search_result.get('status') not in COUNTED_STATUSES:
+            self.failed_calls += 1
+            print(f"  → Falha na busca ({search_result.get('status', 'sem resposta')}): {area['name']}")
+        else:
+            area_places = search_result.get('results', [])
+            
+            # Busca páginas adicionais (máximo 3 por área)
+            next_page_token = search_result.get('next_page_token')
+            page = 2
+            
+            while next_page_token and page <= 3:
+                time.sleep(2)
+                search_result = self.search_nearby_places(
+                    {"lat": area["lat"], "lng": area["lng"]}, 
+                    area["radius"], 
+                    next_page_token=next_page_token
+                )
+                
+                if search_result.get('status') not in COUNTED_STATUSES:
+                    self.failed_calls += 1
+                    print(f"    Falha na página {page}: {search_result.get('status', 'sem resposta')}")
+                    break
+                area_places.extend(search_result.get('results', []))
+                
+                next_page_token = search_result.get('next_page_token')
+                page += 1
+            
+            # Adiciona apenas locais únicos
+            new_places = self._add_new_places(all_places, area_places)
+            print(f"  Encontrados {new_places} novos {LOCAL} na {area['name']}")
+        
+        time.sleep(1)  # Delay entre áreas
+        return new_places
+    
+    def collect_all_local(self) -> List[Dict]:
+        """
+        Coleta todos os dados dos locais em São Paulo usando múltiplas estratégias
+        para superar o limite de 60 resultados do Nearby Search
+        """
+        print(f"Iniciando busca abrangente por {LOCAL} em São Paulo...")
+        all_places = {}  # Usar dict para evitar duplicatas por place_id
+        
+        # ESTRATÉGIA 1: Text Search por Distritos de São Paulo
+        print("\n=== ESTRATÉGIA 1: Text Search por Distritos ===")
+        
+        distritos_list = self.district_list()
+        if os.getenv('DISTRITOS_SP', ''):
+            print(f"📍 Carregados {len(distritos_list)} distritos de São Paulo do .env")
+        else:
+            print("⚠️ DISTRITOS_SP não encontrada no .env, usando busca básica")
+        
+        # Planejador: ordena distritos/templates pelo rendimento histórico e
+        # corta variantes e páginas que não trazem novos locais
+        planner = self.planner
+        distritos_list = planner.order_districts(distritos_list)
+        
+        print(f"🔍 Executando buscas específicas em {len(distritos_list)} distritos...")
+        
+        for i, distrito in enumerate(distritos_list, 1):
+            self.search_district(distrito, all_places, label=f"({i}/{len(distritos_list)})")
+        
+        planner.save_stats()
+        print(f"\n📉 Planejador: {planner.calls} chamadas executadas, {planner.skipped} puladas por baixo rendimento, "
+              f"{planner.failed} com falha")
         print(f"\n✅ Text Search por Distritos encontrou {len(all_places)} {LOCAL} únicos")
         
         # ESTRATÉGIA 2: Nearby Search em múltiplas áreas
         print("\n=== ESTRATÉGIA 2: Nearby Search por áreas ===")
-        search_areas = [
-            {"name": "Centro/Sé", "lat": -23.5505, "lng": -46.6333, "radius": 8000},
-            {"name": "Zona Sul", "lat": -23.6094, "lng": -46.6927, "radius": 8000},
-            {"name": "Zona Norte", "lat": -23.4858, "lng": -46.6311, "radius": 8000},
-            {"name": "Zona Oeste", "lat": -23.5280, "lng": -46.7425, "radius": 8000},
-            {"name": "Zona Leste", "lat": -23.5629, "lng": -46.5477, "radius": 8000},
-            {"name": "ABC Paulista", "lat": -23.6648, "lng": -46.5348, "radius": 10000},
-            {"name": "Guarulhos", "lat": -23.4543, "lng": -46.5339, "radius": 8000},
-            {"name": "Osasco", "lat": -23.5329, "lng": -46.7918, "radius": 8000},
-        ]
-        
         initial_count = len(all_places)
         
-        for area in search_areas:
-            print(f"Buscando na {area['name']}...")
-            
-            search_result = self.search_nearby_places(
-                {"lat": area["lat"], "lng": area["lng"]}, 
-                area["radius"], 
-                LOCAL
-            )
-            
-            if 'results' in search_result:
-                area_places = search_result['results']
-                
-                # Busca páginas adicionais (máximo 3 por área)
-                next_page_token = search_result.get('next_page_token')
-                page = 2
-                
-                while next_page_token and page <= 3:
-                    time.sleep(2)
-                    search_result = self.search_nearby_places(
-                        {"lat": area["lat"], "lng": area["lng"]}, 
-                        area["radius"], 
-                        next_page_token=next_page_token
-                    )
-                    
-                    if 'results' in search_result:
-                        area_places.extend(search_result['results'])
-                    
-                    next_page_token = search_result.get('next_page_token')
-                    page += 1
-                
-                # Adiciona apenas locais únicos
-                new_places = 0
-                for place in area_places:
-                    if place['place_id'] not in all_places:
-                        all_places[place['place_id']] = place
-                        new_places += 1
-                
-                print(f"  Encontrados {new_places} novos {LOCAL} na {area['name']}")
-            
-            time.sleep(1)  # Delay entre áreas
+        for area in SEARCH_AREAS:
+            self.search_area(area, all_places)
         
         nearby_new = len(all_places) - initial_count
         print(f"Nearby Search adicionou {nearby_new} {LOCAL} únicos")
@@ -379,48 +481,109 @@ class DataCollector:
         for i, (place_id, place) in enumerate(all_places.items(), 1):
             print(f"Processando {i}/{len(all_places)}: {place.get('name', 'N/A')}")
             
-            # Obtém detalhes completos
-            details = self.get_place_details(place['place_id'])
-            
-            if details:
-                combined_data = {
-                        'place_id': place['place_id'],
-                        'name': details.get('name', place.get('name', 'N/A')),
-                        'address': details.get('formatted_address', 'N/A'),
-                        'distrito': self.extract_district_from_address(details.get('formatted_address', '')),
-                        'latitude': details.get('geometry', {}).get('location', {}).get('lat', 'N/A'),
-                        'longitude': details.get('geometry', {}).get('location', {}).get('lng', 'N/A'),
-                        'phone': details.get('formatted_phone_number', 'N/A'),
-                        'website': details.get('website', 'N/A'),
-                        'rating': details.get('rating', 'N/A'),
-                        'total_ratings': details.get('user_ratings_total', 'N/A'),
-                        'price_level': details.get('price_level', 'N/A'),
-                        'business_status': details.get('business_status', 'N/A'),
-                        'is_open_now': place.get('opening_hours', {}).get('open_now', 'N/A'),
-                        'types': ', '.join(details.get('types', [])),
-                        'opening_hours': self.format_opening_hours(details.get('opening_hours', {})),
-                        'photos_count': len(details.get('photos', [])),
-                        'reviews_count': len(details.get('reviews', [])),
-                        'delivery': details.get('delivery', 'N/A'),
-                        'dine_in': details.get('dine_in', 'N/A'),
-                        'takeout': details.get('takeout', 'N/A'),
-                        'serves_breakfast': details.get('serves_breakfast', 'N/A'),
-                        'serves_dinner': details.get('serves_dinner', 'N/A'),
-                        'serves_lunch': details.get('serves_lunch', 'N/A'),
-                        'wheelchair_accessible_entrance': details.get('wheelchair_accessible_entrance', 'N/A'),
-                    }
-                
-                local_data.append(combined_data)
+            record = self.fetch_record(place)
+            if record:
+                local_data.append(record)
             
             # Rate limiting
             time.sleep(0.1)
         
         self.results = local_data
         print(f"\n🎉 COLETA CONCLUÍDA! Encontrados {len(local_data)} {LOCAL} em São Paulo")
-        print(f"   📍 Busca realizada em {len(distritos_list) if 'distritos_list' in locals() else 'múltiplos'} distritos")
+        print(f"   📍 Busca realizada em {len(distritos_list)} distritos")
         print(f"   🔍 Cobertura completa da região metropolitana!")
         return local_data
     
+    def fetch_record(self, place: Dict) -> Optional[Dict]:
+        """
+        Obtém os detalhes completos de um local e monta seu registro SOR
+        """
+        details = self.get_place_details(place['place_id'])
+        if not details:
+            return None
+        return self.build_record(place, details)
+    
+    def build_record(self, place: Dict, details: Dict) -> Dict:
+        """
+        Monta o registro SOR a partir do resultado da busca e dos detalhes do lugar
+        """
+        return {
+            'place_id': place['place_id'],
+            'name': details.get('name', place.get('name', 'N/A')),
+            'address': details.get('formatted_address', 'N/A'),
+            'distrito': self.extract_district_from_address(details.get('formatted_address', '')),
+            'latitude': details.get('geometry', {}).get('location', {}).get('lat', 'N/A'),
+            'longitude': details.get('geometry', {}).get('location', {}).get('lng', 'N/A'),
+            'phone': details.get('formatted_phone_number', 'N/A'),
+            'website': details.get('website', 'N/A'),
+            'rating': details.get('rating', 'N/A'),
+            'total_ratings': details.get('user_ratings_total', 'N/A'),
+            'price_level': details.get('price_level', 'N/A'),
+            'business_status': details.get('business_status', 'N/A'),
+            'is_open_now': place.get('opening_hours', {}).get('open_now', 'N/A'),
+            'types': ', '.join(details.get('types', [])),
+            'opening_hours': self.format_opening_hours(details.get('opening_hours', {})),
+            'opening_hours_bitmap': encode_periods(details.get('opening_hours', {}).get('periods', [])),
+            'photos_count': len(details.get('photos', [])),
+            'reviews_count': len(details.get('reviews', [])),
+            'delivery': details.get('delivery', 'N/A'),
+            'dine_in': details.get('dine_in', 'N/A'),
+            'takeout': details.get('takeout', 'N/A'),
+            'serves_breakfast': details.get('serves_breakfast', 'N/A'),
+            'serves_dinner': details.get('serves_dinner', 'N/A'),
+            'serves_lunch': details.get('serves_lunch', 'N/A'),
+            'wheelchair_accessible_entrance': details.get('wheelchair_accessible_entrance', 'N/A'),
+        }
+    
+    def rebuild_from_archive(self) -> List[Dict]:
+        """
+        Regenera os registros SOR a partir das respostas brutas arquivadas,
+        sem nenhuma chamada à API. Lê o diretório configurado e os
+        subdiretórios dos workers da coleta distribuída; para cada lugar
+        vale a resposta mais recente entre todos os arquivos
+        """
+        if self.archive is None:
+            raise ValueError("Nenhum arquivo de respostas brutas configurado")
+        
+        archives = open_archives(self.archive.directory)
+        
+        # place_id -> (ts, resposta); o ts ISO do arquivo ordena as respostas
+        places = {}
+        details = {}
+        
+        def keep_latest(target: Dict, key: str, ts: str, value: Dict):
+            if key not in target or ts >= target[key][0]:
+                target[key] = (ts, value)
+        
+        for archive in archives:
+            for record in archive.records():
+                payload = record.get('payload', {})
+                ts = record.get('ts', '')
+                if record['kind'] == 'details':
+                    if payload.get('result'):
+                        keep_latest(details, record['key'], ts, payload['result'])
+                else:
+                    for place in payload.get('results', []):
+                        keep_latest(places, place['place_id'], ts, place)
+        
+        self.results = [
+            self.build_record(places[place_id][1] if place_id in places else {'place_id': place_id}, place_details)
+            for place_id, (_, place_details) in details.items()
+        ]
+        print(f"♻️ {len(self.results)} {LOCAL} reconstruídos a partir de {len(archives)} arquivo(s) em {self.archive.directory}")
+        return self.results
+    
+    def _add_new_places(self, all_places: Dict, places: List[Dict]) -> int:
+        """
+        Adiciona ao dicionário apenas os locais ainda não vistos e retorna quantos foram novos
+        """
+        new_places = 0
+        for place in places:
+            if place['place_id'] not in all_places:
+                all_places[place['place_id']] = place
+                new_places += 1
+        return new_places
+    
     def format_opening_hours(self, opening_hours: Dict) -> str:
         """
         Formata horários de funcionamento
@@ -473,11 +636,25 @@ def main():
     """
     Função principal
     """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--archive-dir", default=os.getenv('RAW_ARCHIVE_DIR', f"{LOCAL}_raw_archive"),
+                    help="Diretório do arquivo de respostas brutas da API")
+    ap.add_argument("--archive-codec", choices=["gzip", "zstd"], default="gzip",
+                    help="Compressão dos segmentos do arquivo")
+    ap.add_argument("--no-archive", action="store_true", help="Não arquiva as respostas brutas")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="Regenera o SOR a partir do arquivo de respostas brutas, sem chamadas à API")
+    args = ap.parse_args()
+    
     try:
-        collector = DataCollector()
+        archive = None if args.no_archive and not args.rebuild else RawArchive(args.archive_dir, args.archive_codec)
+        collector = DataCollector(archive=archive, offline=args.rebuild)
         
-        # Coleta os dados
-        local_data = collector.collect_all_local()
+        # Coleta os dados (ou reprocessa o arquivo local)
+        if args.rebuild:
+            local_data = collector.rebuild_from_archive()
+        else:
+            local_data = collector.collect_all_local()
         json_file = collector.save_to_json()
         csv_file = collector.save_to_csv()
         
@@ -1,4 +1,5 @@
-import json, re, unicodedata, argparse, time, sys, requests
+import json, re, unicodedata, argparse, time, sys, requests, textwrap
+from collections import OrderedDict
 from pathlib import Path
 import pandas as pd
 from tqdm import tqdm
@@ -165,6 +166,212 @@ def save_cache(path: Path, cache: dict):
     if path:
         path.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
 
+class LRUCache(OrderedDict):
+    """Cache limitado a max_entries; descarta as entradas usadas há mais tempo (modo --stream)."""
+
+    def __init__(self, data: dict, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        for key, value in data.items():
+            self[key] = value
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.max_entries:
+            self.popitem(last=False)
+
+# ----------------- Normalização -----------------
+
+def normalize_row(row: dict, cache: dict, use_nominatim: bool, sleep: float, today: datetime):
+    """Resolve o distrito de um registro; retorna None se não for São Paulo - SP."""
+    address = str(row.get("address") or "")
+    lat = row.get("latitude") or row.get("geometry",{}).get("location",{}).get("lat")
+    lon = row.get("longitude") or row.get("geometry",{}).get("location",{}).get("lng")
+
+    # 0) Filtrar São Paulo - SP
+    if not _has_city_sao_paulo(address):
+        if use_nominatim and lat is not None and lon is not None:
+            key = f"rev:{lat},{lon}"
+            js = cache.get(key)
+            if js is None:
+                try:
+                    js = nominatim_reverse(float(lat), float(lon), sleep)
+                    cache[key] = js
+                except Exception:
+                    js = None
+            if js and isinstance(js, dict):
+                city = _norm(js.get("address",{}).get("city") or js.get("address",{}).get("town") or "")
+                state = _norm(js.get("address",{}).get("state") or "")
+                country = _norm(js.get("address",{}).get("country_code") or "")
+                if city == "sao paulo" and (state in ("sp","sao paulo")) and country == "br":
+                    pass
+                else:
+                    return None
+            else:
+                if any(city in _norm(address) for city in CIDADES_GRANDE_SP):
+                    return None
+                if "sao paulo" not in _norm(address) and "são paulo" not in _norm(address):
+                    return None
+        else:
+            if any(city in _norm(address) for city in CIDADES_GRANDE_SP):
+                return None
+            if "sao paulo" not in _norm(address) and "são paulo" not in _norm(address):
+                return None
+
+    # 1) Original válido
+    prev = row.get("distrito")
+    if isinstance(prev, str) and _norm(prev) in DIST_NORM:
+        distrito, conf, metodo = DIST_NORM[_norm(prev)], "alta", "original"
+    else:
+        # 2) Endereço explícito
+        distrito = _find_distrito_in_address(address)
+        if distrito:
+            conf, metodo = "alta", "address"
+        else:
+            # 3) Bairro→Distrito
+            distrito = _fallback_from_neighborhood(address)
+            if distrito:
+                conf, metodo = "média", "bairro"
+            else:
+                conf, metodo = "baixa", "nao_identificado"
+
+    # 4) Nominatim (opcional), se ainda baixa/média
+    if use_nominatim and (conf in ("baixa","média")):
+        # 4a) search por endereço
+        if address.strip():
+            key = f"fwd:{_norm(address)}"
+            js = cache.get(key)
+            if js is None:
+                try:
+                    js = nominatim_search(address, sleep)
+                    cache[key] = js
+                except Exception:
+                    js = None
+            if js and isinstance(js, dict):
+                distrito_n, conf_n = _pick_distrito_from_nominatim(js.get("address", {}))
+                if distrito_n != "Não Identificado":
+                    distrito, conf, metodo = distrito_n, conf_n, "nominatim_search"
+        # 4b) reverse por lat/lon
+        if (conf in ("baixa","média")) and (lat is not None and lon is not None):
+            key = f"rev:{lat},{lon}"
+            js = cache.get(key)
+            if js is None:
+                try:
+                    js = nominatim_reverse(float(lat), float(lon), sleep)
+                    cache[key] = js
+                except Exception:
+                    js = None
+            if js and isinstance(js, dict):
+                distrito_n, conf_n = _pick_distrito_from_nominatim(js.get("address", {}))
+                if distrito_n != "Não Identificado":
+                    distrito, conf, metodo = distrito_n, conf_n, "nominatim_reverse"
+
+    row["distrito_atualizado"] = distrito
+    row["confianca_distrito"] = conf
+    row["metodo_distrito"] = metodo
+
+    row["year"] = today.year
+    row["month"] = today.month
+    row["day"] = today.day
+    return row
+
+# ----------------- Leitura/escrita em streaming -----------------
+
+_ARRAY_SEP = re.compile(r"[\s,]*")
+
+def iter_records(path: Path, chunk_chars: int = 1 << 20):
+    """Lê registros de um NDJSON ou de um array JSON sem carregar o arquivo inteiro."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = f.read(chunk_chars).lstrip()
+        if not buf.startswith("["):
+            # NDJSON: um registro por linha
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        # Decodifica a partir de uma posição no buffer; o buffer só é
+        # recortado quando um novo bloco é lido, evitando cópias por registro
+        pos = 1
+        eof = False
+        while True:
+            pos = _ARRAY_SEP.match(buf, pos).end()
+            if buf.startswith("]", pos):
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("buffer vazio")
+                obj, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Registro incompleto no buffer: lê mais um bloco
+                if eof:
+                    raise ValueError(f"Array JSON incompleto em {path}")
+                more = f.read(chunk_chars)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield obj
+
+class StreamWriter:
+    """Grava JSON (array ou NDJSON) incrementalmente e, ao final, o CSV a partir do próprio JSON."""
+
+    def __init__(self, json_path: str, csv_path: str, chunk_size: int = 5000):
+        self.json_path = json_path
+        self.ndjson = json_path.endswith((".ndjson", ".jsonl"))
+        self.json_file = open(json_path, "w", encoding="utf-8")
+        self.csv_path = csv_path
+        self.chunk_size = chunk_size
+        self.columns = {}  # união das colunas, na ordem em que aparecem
+        self.count = 0
+        if not self.ndjson:
+            self.json_file.write("[")
+
+    def write_chunk(self, rows: list):
+        for row in rows:
+            if self.ndjson:
+                self.json_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                sep = ",\n" if self.count else "\n"
+                self.json_file.write(sep + textwrap.indent(json.dumps(row, ensure_ascii=False, indent=2), "  "))
+            self.columns.update(dict.fromkeys(row))
+            self.count += 1
+
+    def _write_csv(self):
+        # Segunda passada sobre o JSON gravado: as colunas do CSV são a união de
+        # todos os registros (entradas com esquemas diferentes não perdem colunas);
+        # dtype object evita que a inferência por bloco formate o mesmo valor de jeitos diferentes
+        columns = list(self.columns)
+        header = True
+        chunk = []
+        for row in iter_records(Path(self.json_path)):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._append_csv(chunk, columns, header)
+                header = False
+                chunk = []
+        if chunk or header:
+            self._append_csv(chunk, columns, header)
+
+    def _append_csv(self, rows: list, columns: list, header: bool):
+        df = pd.DataFrame(rows, dtype=object).reindex(columns=columns)
+        df.to_csv(self.csv_path, mode="w" if header else "a", header=header, index=False, encoding="utf-8")
+
+    def close(self):
+        if not self.ndjson:
+            self.json_file.write("\n]" if self.count else "]")
+        self.json_file.close()
+        self._write_csv()
+
 # ----------------- Main -----------------
 
 def main():
@@ -176,121 +383,56 @@ def main():
     ap.add_argument("--use-nominatim", action="store_true", help="Habilita consultas à API pública Nominatim")
     ap.add_argument("--cache-file", default=f"{LOCAL}_cache_nominatim.json", help="Arquivo de cache (json) p/ respostas do Nominatim")
     ap.add_argument("--sleep", type=float, default=1.1, help="Intervalo entre requests (segundos)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Lê NDJSON ou array JSON incrementalmente e grava as saídas em blocos (memória constante); "
+                         "--output-json terminado em .ndjson/.jsonl grava NDJSON")
+    ap.add_argument("--chunk-size", type=int, default=5000, help="Registros por bloco no modo --stream")
+    ap.add_argument("--cache-size", type=int, default=100_000,
+                    help="Máximo de respostas do Nominatim mantidas em memória (e gravadas no cache) no modo --stream")
     args = ap.parse_args()
 
-    data = json.loads(Path(args.input_json).read_text(encoding="utf-8"))
+    if args.stream:
+        data = iter_records(Path(args.input_json))
+    else:
+        data = json.loads(Path(args.input_json).read_text(encoding="utf-8"))
 
     cache_path = Path(args.cache_file) if args.use_nominatim else None
     cache = load_cache(cache_path) if args.use_nominatim else {}
+    if args.stream and args.use_nominatim:
+        cache = LRUCache(cache, args.cache_size)
 
-    total = len(data)
+    total = 0
     kept_sp = 0
     resolved = 0
     methods_count = {"original":0, "address":0, "bairro":0, "nominatim_search":0, "nominatim_reverse":0, "nao_identificado":0}
 
+    writer = StreamWriter(args.output_json, args.output_csv, args.chunk_size) if args.stream else None
     out = []
-    for i, row in enumerate(tqdm(data, desc="Processando registros", unit="reg")):
-        address = str(row.get("address") or "")
-        lat = row.get("latitude") or row.get("geometry",{}).get("location",{}).get("lat")
-        lon = row.get("longitude") or row.get("geometry",{}).get("location",{}).get("lng")
-
-        # 0) Filtrar São Paulo - SP
-        if not _has_city_sao_paulo(address):
-            if args.use_nominatim and lat is not None and lon is not None:
-                key = f"rev:{lat},{lon}"
-                js = cache.get(key)
-                if js is None:
-                    try:
-                        js = nominatim_reverse(float(lat), float(lon), args.sleep)
-                        cache[key] = js
-                    except Exception:
-                        js = None
-                if js and isinstance(js, dict):
-                    city = _norm(js.get("address",{}).get("city") or js.get("address",{}).get("town") or "")
-                    state = _norm(js.get("address",{}).get("state") or "")
-                    country = _norm(js.get("address",{}).get("country_code") or "")
-                    if city == "sao paulo" and (state in ("sp","sao paulo")) and country == "br":
-                        pass
-                    else:
-                        continue
-                else:
-                    if any(city in _norm(address) for city in CIDADES_GRANDE_SP):
-                        continue
-                    if "sao paulo" not in _norm(address) and "são paulo" not in _norm(address):
-                        continue
-            else:
-                if any(city in _norm(address) for city in CIDADES_GRANDE_SP):
-                    continue
-                if "sao paulo" not in _norm(address) and "são paulo" not in _norm(address):
-                    continue
+    for row in tqdm(data, desc="Processando registros", unit="reg"):
+        total += 1
+        row = normalize_row(row, cache, args.use_nominatim, args.sleep, today)
+        if row is None:
+            continue
 
         kept_sp += 1
-
-        # 1) Original válido
-        prev = row.get("distrito")
-        if isinstance(prev, str) and _norm(prev) in DIST_NORM:
-            distrito, conf, metodo = DIST_NORM[_norm(prev)], "alta", "original"
-        else:
-            # 2) Endereço explícito
-            distrito = _find_distrito_in_address(address)
-            if distrito:
-                conf, metodo = "alta", "address"
-            else:
-                # 3) Bairro→Distrito
-                distrito = _fallback_from_neighborhood(address)
-                if distrito:
-                    conf, metodo = "média", "bairro"
-                else:
-                    conf, metodo = "baixa", "nao_identificado"
-
-        # 4) Nominatim (opcional), se ainda baixa/média
-        if (conf in ("baixa","média")):
-            # 4a) search por endereço
-            if address.strip():
-                key = f"fwd:{_norm(address)}"
-                js = cache.get(key)
-                if js is None:
-                    try:
-                        js = nominatim_search(address, args.sleep)
-                        cache[key] = js
-                    except Exception:
-                        js = None
-                if js and isinstance(js, dict):
-                    distrito_n, conf_n = _pick_distrito_from_nominatim(js.get("address", {}))
-                    if distrito_n != "Não Identificado":
-                        distrito, conf, metodo = distrito_n, conf_n, "nominatim_search"
-            # 4b) reverse por lat/lon
-            if (conf in ("baixa","média")) and (lat is not None and lon is not None):
-                key = f"rev:{lat},{lon}"
-                js = cache.get(key)
-                if js is None:
-                    try:
-                        js = nominatim_reverse(float(lat), float(lon), args.sleep)
-                        cache[key] = js
-                    except Exception:
-                        js = None
-                if js and isinstance(js, dict):
-                    distrito_n, conf_n = _pick_distrito_from_nominatim(js.get("address", {}))
-                    if distrito_n != "Não Identificado":
-                        distrito, conf, metodo = distrito_n, conf_n, "nominatim_reverse"
-
-        row["distrito_atualizado"] = distrito
-        row["confianca_distrito"] = conf
-        row["metodo_distrito"] = metodo
-
-        row["year"] = today.year
-        row["month"] = today.month
-        row["day"] = today.day
+        metodo = row["metodo_distrito"]
         methods_count[metodo] = methods_count.get(metodo, 0) + 1
-        if distrito != "Não Identificado":
+        if row["distrito_atualizado"] != "Não Identificado":
             resolved += 1
         out.append(row)
+        if writer and len(out) >= args.chunk_size:
+            writer.write_chunk(out)
+            out = []
 
     if args.use_nominatim:
         save_cache(cache_path, cache)
 
-    Path(args.output_json).write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-    pd.DataFrame(out).to_csv(args.output_csv, index=False, encoding="utf-8")
+    if writer:
+        writer.write_chunk(out)
+        writer.close()
+    else:
+        Path(args.output_json).write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+        pd.DataFrame(out).to_csv(args.output_csv, index=False, encoding="utf-8")
 
     print(f"Total registros entrada: {total}")
     print(f"Mantidos São Paulo - SP: {kept_sp}")
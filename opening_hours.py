@@ -0,0 +1,259 @@
+"""
+Índice semanal compilado dos horários de funcionamento
+
+Cada loja vira um bitmap de 7 dias × 96 slots de 15 minutos (672 bits,
+84 bytes) construído a partir de opening_hours.periods da Places API.
+As consultas "aberto no instante T" são operações vetorizadas NumPy
+sobre a matriz empacotada de todas as lojas.
+"""
+
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DAYS = 7                      # 0 = domingo, como na Places API
+SLOTS_PER_HOUR = 4
+SLOTS_PER_DAY = 24 * SLOTS_PER_HOUR
+WEEK_SLOTS = DAYS * SLOTS_PER_DAY
+WEEK_BYTES = WEEK_SLOTS // 8
+DAY_NAMES = ["Domingo", "Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado"]
+
+
+def _minutes(day: int, hhmm: str) -> int:
+    hhmm = str(hhmm).zfill(4)
+    return day * 24 * 60 + int(hhmm[:2]) * 60 + int(hhmm[2:])
+
+
+def _slot(day: int, hhmm: str) -> int:
+    return _minutes(day, hhmm) // 15
+
+
+def periods_to_slots(periods: List[Dict]) -> Optional[np.ndarray]:
+    """
+    Converte opening_hours.periods em um vetor booleano de 672 slots;
+    retorna None se não houver períodos
+
+    Um slot só é marcado se a loja fica aberta durante os 15 minutos inteiros:
+    aberturas são arredondadas para cima e fechamentos para baixo, de modo
+    que o bitmap nunca indica aberta uma loja fechada
+    """
+    if not periods:
+        return None
+
+    slots = np.zeros(WEEK_SLOTS, dtype=bool)
+    for period in periods:
+        start = period.get("open")
+        if not start:
+            continue
+        end = period.get("close")
+        # Sem 'close': aberto 24 horas, todos os dias
+        if not end:
+            slots[:] = True
+            return slots
+
+        opens = _minutes(start["day"], start["time"])
+        closes = _minutes(end["day"], end["time"])
+        if closes <= opens:
+            # Período atravessa o fim da semana (sábado → domingo)
+            closes += DAYS * 24 * 60
+
+        a = -(-opens // 15)
+        b = closes // 15
+        if b > a:
+            slots[np.arange(a, b) % WEEK_SLOTS] = True
+    return slots
+
+
+def encode_periods(periods: List[Dict]) -> str:
+    """
+    Codifica os períodos como bitmap hexadecimal (168 caracteres) para gravar no SOR
+    """
+    slots = periods_to_slots(periods)
+    if slots is None:
+        return 'N/A'
+    return np.packbits(slots).tobytes().hex()
+
+
+def _parse_time(time: str) -> str:
+    """
+    Valida um horário 'HH:MM' ou 'HHMM' (00:00 a 23:59) e o devolve como 'HHMM'
+    """
+    text = str(time).strip()
+    try:
+        parsed = datetime.strptime(text, "%H:%M") if ":" in text else datetime.strptime(text.zfill(4), "%H%M")
+    except ValueError:
+        raise ValueError(f"Horário inválido: {time} (use HH:MM, de 00:00 a 23:59)")
+    return parsed.strftime("%H%M")
+
+
+def _slot_of_time(day: int, time: str) -> int:
+    if not 0 <= day < DAYS:
+        raise ValueError(f"Dia inválido: {day} (use 0 = domingo a 6 = sábado)")
+    return _slot(day, _parse_time(time))
+
+
+def _time_arg(value: str) -> str:
+    try:
+        _parse_time(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+class OpeningHoursIndex:
+    def __init__(self, place_ids: List[str], packed: np.ndarray, groups: Optional[Dict[str, List]] = None):
+        """
+        Args:
+            place_ids: IDs das lojas, na ordem das linhas de packed
+            packed: Matriz uint8 (n, 84) com os bitmaps empacotados
+            groups: Colunas de agrupamento (ex.: {'distrito_atualizado': [...]})
+        """
+        self.place_ids = np.asarray(place_ids, dtype=object)
+        self.packed = np.ascontiguousarray(packed, dtype=np.uint8).reshape(-1, WEEK_BYTES)
+        self.groups = {k: np.asarray(v, dtype=object) for k, v in (groups or {}).items()}
+        # Cópia byte-major: a consulta de um slot lê uma linha contígua em vez de uma coluna
+        self._by_byte = np.ascontiguousarray(self.packed.T)
+        self._slots = None
+
+    @classmethod
+    def from_records(cls, records: List[Dict], bitmap_col: str = "opening_hours_bitmap",
+                     group_cols: tuple = ("distrito_atualizado", "distrito")) -> "OpeningHoursIndex":
+        """
+        Constrói o índice a partir de registros SOR/SOT; lojas sem horário conhecido são ignoradas
+        """
+        place_ids, rows = [], []
+        groups = {c: [] for c in group_cols if records and c in records[0]}
+        for record in records:
+            bitmap = record.get(bitmap_col)
+            if not isinstance(bitmap, str) or len(bitmap) != WEEK_BYTES * 2:
+                continue
+            place_ids.append(record.get("place_id"))
+            rows.append(np.frombuffer(bytes.fromhex(bitmap), dtype=np.uint8))
+            for c in groups:
+                groups[c].append(record.get(c))
+        packed = np.vstack(rows) if rows else np.zeros((0, WEEK_BYTES), dtype=np.uint8)
+        return cls(place_ids, packed, groups)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "OpeningHoursIndex":
+        """
+        Carrega registros de um CSV ou JSON (SOR/SOT) ou um índice salvo em .npz
+        """
+        path = Path(path)
+        if path.suffix == ".npz":
+            data = np.load(path, allow_pickle=True)
+            groups = {k[len("group_"):]: data[k] for k in data.files if k.startswith("group_")}
+            return cls(data["place_ids"], data["packed"], groups)
+        if path.suffix == ".csv":
+            records = pd.read_csv(path, dtype=str).to_dict("records")
+        else:
+            records = json.loads(path.read_text(encoding="utf-8"))
+        return cls.from_records(records, **kwargs)
+
+    def save(self, path: str):
+        """
+        Salva o índice compilado em .npz
+        """
+        np.savez_compressed(path, place_ids=self.place_ids, packed=self.packed,
+                            **{f"group_{k}": v for k, v in self.groups.items()})
+
+    def __len__(self) -> int:
+        return len(self.place_ids)
+
+    # ----------------- Consultas -----------------
+
+    def open_at(self, day: int, time: str) -> np.ndarray:
+        """
+        Máscara booleana das lojas abertas no dia (0 = domingo) e horário ('HH:MM' ou 'HHMM')
+        """
+        slot = _slot_of_time(day, time)
+        return ((self._by_byte[slot >> 3] >> (7 - (slot & 7))) & 1).astype(bool)
+
+    def open_at_datetime(self, dt: datetime) -> np.ndarray:
+        """
+        Máscara das lojas abertas em um datetime (weekday do Python: 0 = segunda)
+        """
+        return self.open_at((dt.weekday() + 1) % DAYS, dt.strftime("%H%M"))
+
+    @property
+    def slots(self) -> np.ndarray:
+        """
+        Matriz booleana (n, 7, 96) desempacotada, calculada sob demanda
+        """
+        if self._slots is None:
+            self._slots = np.unpackbits(self.packed, axis=1).astype(bool).reshape(-1, DAYS, SLOTS_PER_DAY)
+        return self._slots
+
+    def open_during(self, day: int, start: str, end: str) -> np.ndarray:
+        """
+        Máscara das lojas abertas durante toda a janela [start, end) do dia
+        """
+        a = _slot_of_time(0, start)
+        b = _slot_of_time(0, end)
+        flat = self.slots.reshape(len(self), WEEK_SLOTS)
+        offset = day * SLOTS_PER_DAY
+        if b <= a:
+            # Janela atravessa a meia-noite
+            window = np.r_[offset + a:offset + SLOTS_PER_DAY, np.arange(b) + (offset + SLOTS_PER_DAY) % WEEK_SLOTS]
+        else:
+            window = np.arange(offset + a, offset + b)
+        return flat[:, window].all(axis=1)
+
+    def stores_open_at(self, day: int, time: str) -> List[str]:
+        """
+        IDs das lojas abertas no dia e horário
+        """
+        return list(self.place_ids[self.open_at(day, time)])
+
+    def coverage_by_hour(self, by: Optional[str] = None) -> pd.DataFrame:
+        """
+        Fração das lojas abertas em algum momento de cada hora da semana,
+        opcionalmente por grupo (ex.: 'distrito_atualizado')
+
+        Returns:
+            DataFrame com índice (grupo, dia) e colunas 0..23
+        """
+        hourly = self.slots.reshape(len(self), DAYS, 24, SLOTS_PER_HOUR).any(axis=3)
+        keys = self.groups[by] if by else np.full(len(self), "Total", dtype=object)
+
+        frames = []
+        for key in pd.unique(keys):
+            share = hourly[keys == key].mean(axis=0)
+            df = pd.DataFrame(share, columns=range(24))
+            df.insert(0, "dia", DAY_NAMES)
+            df.insert(0, by or "grupo", key)
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=[by or "grupo", "dia", *range(24)])
+        return pd.concat(frames, ignore_index=True).set_index([by or "grupo", "dia"])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, help="CSV/JSON (SOR/SOT) com opening_hours_bitmap ou índice .npz")
+    ap.add_argument("--day", type=int, required=True, choices=range(DAYS), metavar="{0-6}",
+                    help="Dia da semana (0 = domingo)")
+    ap.add_argument("--time", type=_time_arg, required=True, help="Horário (HH:MM)")
+    ap.add_argument("--by", default=None, help="Coluna de agrupamento para a contagem (ex.: distrito_atualizado)")
+    ap.add_argument("--save-index", default=None, help="Salva o índice compilado em .npz")
+    args = ap.parse_args()
+
+    index = OpeningHoursIndex.from_file(args.input)
+    if args.save_index:
+        index.save(args.save_index)
+
+    mask = index.open_at(args.day, args.time)
+    print(f"{mask.sum()} de {len(index)} lojas abertas em {DAY_NAMES[args.day]} às {args.time}")
+    if args.by:
+        counts = pd.Series(index.groups[args.by][mask]).value_counts()
+        for key, count in counts.items():
+            print(f"  - {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Planejador de consultas do Text Search guiado pelo rendimento marginal
+(novos place_ids únicos por chamada) de cada template, distrito e página
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Templates de busca por distrito, do principal para as variantes
+QUERY_TEMPLATES = [
+    "{local} {distrito} São Paulo",
+    "{local} {distrito} São Paulo SP",
+]
+
+# Status da API que refletem o rendimento real da consulta; os demais
+# (OVER_QUERY_LIMIT, REQUEST_DENIED, erros de rede...) não entram no histórico
+COUNTED_STATUSES = ("OK", "ZERO_RESULTS")
+
+
+class QueryPlanner:
+    def __init__(self, stats_file: Optional[str] = None, min_yield: float = 1.0,
+                 min_observations: int = 2, max_pages: int = 3, reprobe_every: int = 5,
+                 read_only: bool = False):
+        """
+        Args:
+            stats_file: Arquivo JSON onde as estatísticas são persistidas entre execuções
+            min_yield: Rendimento médio (novos locais por chamada) abaixo do qual a consulta é pulada
+            min_observations: Número mínimo de chamadas observadas antes de pular pelo histórico
+            max_pages: Número máximo de páginas por consulta
+            reprobe_every: Após esse número de pulos consecutivos a consulta é refeita,
+                para que o histórico não fique congelado
+            read_only: Se True, save_stats não grava o arquivo (workers da coleta
+                distribuída, que enviam o journal ao coordenador)
+        """
+        self.stats_path = Path(stats_file) if stats_file else None
+        self.read_only = read_only
+        self.min_yield = min_yield
+        self.min_observations = min_observations
+        self.max_pages = max_pages
+        self.reprobe_every = reprobe_every
+
+        self.stats = self.load_stats()
+        self.calls = 0
+        self.skipped = 0
+        self.failed = 0
+        # Eventos (chamadas e pulos) desde o início, para replay em outro planejador
+        self.journal: List[Dict] = []
+
+    # ----------------- Persistência -----------------
+
+    def load_stats(self) -> Dict:
+        if self.stats_path and self.stats_path.exists():
+            try:
+                return json.loads(self.stats_path.read_text(encoding="utf-8"))
+            except Exception:
+                return {}
+        return {}
+
+    def save_stats(self):
+        if self.stats_path and not self.read_only:
+            self.stats_path.write_text(json.dumps(self.stats, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    # ----------------- Estatísticas -----------------
+
+    def _entry(self, template: str, distrito: str, page: int) -> Dict:
+        by_district = self.stats.setdefault(distrito, {})
+        by_template = by_district.setdefault(template, {})
+        return by_template.setdefault(str(page), {"calls": 0, "new": 0, "skips": 0})
+
+    def _avg(self, entries: List[Dict]) -> Optional[float]:
+        calls = sum(e.get("calls", 0) for e in entries)
+        if calls == 0:
+            return None
+        return sum(e.get("new", 0) for e in entries) / calls
+
+    def district_yield(self, distrito: str) -> Optional[float]:
+        """
+        Rendimento médio histórico de todas as consultas de um distrito
+        """
+        entries = [e for pages in self.stats.get(distrito, {}).values() for e in pages.values()]
+        return self._avg(entries)
+
+    def template_yield(self, template: str, distrito: Optional[str] = None) -> Optional[float]:
+        """
+        Rendimento médio histórico de um template (no distrito, se informado)
+        """
+        districts = [distrito] if distrito else list(self.stats)
+        entries = [e for d in districts for e in self.stats.get(d, {}).get(template, {}).values()]
+        return self._avg(entries)
+
+    def record_failure(self):
+        """
+        Contabiliza uma chamada que falhou, sem afetar o histórico de rendimento
+        """
+        self.failed += 1
+
+    def record(self, template: str, distrito: str, page: int, new_places: int):
+        """
+        Registra o resultado de uma chamada bem-sucedida (status em COUNTED_STATUSES)
+        """
+        entry = self._entry(template, distrito, page)
+        entry["calls"] += 1
+        entry["new"] += new_places
+        entry["skips"] = 0
+        self.calls += 1
+        self.journal.append({"event": "record", "template": template, "distrito": distrito,
+                             "page": page, "new": new_places})
+
+    def record_skip(self, template: str, distrito: str, page: int):
+        """
+        Registra uma consulta pulada por baixo rendimento
+        """
+        self._entry(template, distrito, page)["skips"] += 1
+        self.skipped += 1
+        self.journal.append({"event": "skip", "template": template, "distrito": distrito, "page": page})
+
+    def replay(self, events: List[Dict]):
+        """
+        Aplica eventos do journal de outro planejador (ex.: workers da coleta distribuída)
+        """
+        for e in events:
+            if e["event"] == "record":
+                self.record(e["template"], e["distrito"], e["page"], e["new"])
+            else:
+                self.record_skip(e["template"], e["distrito"], e["page"])
+
+    # ----------------- Planejamento -----------------
+
+    def order_districts(self, distritos: List[str]) -> List[str]:
+        """
+        Ordena distritos pelo rendimento histórico (mais produtivos primeiro);
+        distritos sem histórico entram no início para serem explorados
+        """
+        def key(distrito):
+            y = self.district_yield(distrito)
+            return -(y if y is not None else float("inf"))
+        return sorted(distritos, key=key)
+
+    def order_templates(self, distrito: str) -> List[str]:
+        """
+        Ordena os templates do distrito pelo rendimento histórico da primeira página,
+        mantendo a ordem de QUERY_TEMPLATES como desempate
+        """
+        def key(item):
+            idx, template = item
+            entry = self.stats.get(distrito, {}).get(template, {}).get("1")
+            y = self._avg([entry]) if entry else None
+            return (-(y if y is not None else float("inf")), idx)
+        return [t for _, t in sorted(enumerate(QUERY_TEMPLATES), key=key)]
+
+    def should_query(self, template: str, distrito: str, page: int = 1, primary: bool = False) -> bool:
+        """
+        Decide, pelo histórico, se vale a pena executar a consulta (template, distrito, página);
+        a primeira página do template principal do distrito nunca é pulada
+        """
+        if page > self.max_pages:
+            return False
+        if primary and page == 1:
+            return True
+
+        entry = self._entry(template, distrito, page)
+        if entry["calls"] < self.min_observations:
+            return True
+
+        if entry["new"] / entry["calls"] >= self.min_yield:
+            return True
+
+        # Rendimento baixo: pula, mas refaz a consulta periodicamente
+        if entry["skips"] + 1 >= self.reprobe_every:
+            return True
+        self.record_skip(template, distrito, page)
+        return False
+
+    def should_continue(self, template: str, distrito: str, next_page: int, page_new: int) -> bool:
+        """
+        Decide se busca a próxima página, dado o rendimento da página atual
+        """
+        if page_new < self.min_yield:
+            return False
+        return self.should_query(template, distrito, next_page)
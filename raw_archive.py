@@ -0,0 +1,141 @@
+"""
+Arquivo append-only das respostas brutas da Google Places API
+
+Cada resposta é gravada como um registro NDJSON comprimido individualmente
+(membro gzip ou frame zstd) em segmentos rotativos. Um índice NDJSON guarda
+segmento, offset e tamanho de cada registro, permitindo leitura aleatória
+via mmap sem descomprimir o segmento inteiro.
+"""
+
+import gzip
+import json
+import mmap
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # dependência opcional
+    zstandard = None
+
+INDEX_FILE = "index.ndjson"
+EXTENSIONS = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+
+class RawArchive:
+    def __init__(self, directory: str, codec: str = "gzip", max_segment_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            directory: Diretório do arquivo (criado se não existir)
+            codec: 'gzip' (padrão) ou 'zstd' (requer o pacote zstandard)
+            max_segment_bytes: Tamanho a partir do qual um novo segmento é aberto
+        """
+        if codec not in EXTENSIONS:
+            raise ValueError(f"Codec desconhecido: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("Codec 'zstd' requer o pacote zstandard (pip install zstandard)")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.max_segment_bytes = max_segment_bytes
+        self.index_path = self.directory / INDEX_FILE
+        self._segment = self._last_segment()
+
+    # ----------------- Escrita -----------------
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"segment_{number:05d}{EXTENSIONS[self.codec]}"
+
+    def _last_segment(self) -> int:
+        numbers = [int(p.name.split("_")[1].split(".")[0]) for p in self.directory.glob("segment_*")]
+        return max(numbers) if numbers else 0
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor().compress(data)
+        return gzip.compress(data)
+
+    def append(self, kind: str, key: str, payload: Dict) -> Dict:
+        """
+        Grava uma resposta bruta e retorna sua entrada no índice
+
+        Args:
+            kind: Tipo da resposta ('textsearch', 'nearbysearch', 'details')
+            key: Identificador da requisição (query, place_id, página...)
+            payload: JSON retornado pela API
+        """
+        ts = datetime.now().isoformat(timespec="seconds")
+        line = json.dumps({"kind": kind, "key": key, "ts": ts, "payload": payload}, ensure_ascii=False)
+        blob = self._compress((line + "\n").encode("utf-8"))
+
+        path = self._segment_path(self._segment)
+        if path.exists() and path.stat().st_size + len(blob) > self.max_segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+
+        # O índice só é gravado depois do registro, para nunca apontar para dados incompletos
+        entry = {"kind": kind, "key": key, "ts": ts, "segment": path.name, "offset": offset, "length": len(blob)}
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    # ----------------- Leitura -----------------
+
+    def index(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Itera sobre as entradas do índice, opcionalmente filtrando por tipo
+        """
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if kind is None or entry["kind"] == kind:
+                    yield entry
+
+    def _decompress(self, segment: str, blob: bytes) -> bytes:
+        if segment.endswith(EXTENSIONS["zstd"]):
+            if zstandard is None:
+                raise ValueError("Segmentos zstd requerem o pacote zstandard (pip install zstandard)")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return gzip.decompress(blob)
+
+    def records(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Itera sobre os registros arquivados (na ordem de gravação) lendo os
+        segmentos via mmap, sem nenhuma chamada de rede
+        """
+        maps = {}
+        try:
+            for entry in self.index(kind):
+                segment = entry["segment"]
+                if segment not in maps:
+                    f = open(self.directory / segment, "rb")
+                    maps[segment] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                mm = maps[segment][1]
+                blob = mm[entry["offset"]:entry["offset"] + entry["length"]]
+                yield json.loads(self._decompress(segment, blob))
+        finally:
+            for f, mm in maps.values():
+                mm.close()
+                f.close()
+
+
+def open_archives(directory: str) -> List[RawArchive]:
+    """
+    Arquivos existentes no diretório e em seus subdiretórios imediatos
+    (a coleta distribuída grava um subdiretório por worker)
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        return []
+    dirs = [root] + sorted(p for p in root.iterdir() if p.is_dir())
+    return [RawArchive(d) for d in dirs if (d / INDEX_FILE).exists()]
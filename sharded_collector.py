@@ -0,0 +1,372 @@
+"""
+Coleta distribuída entre vários processos do mesmo host com uma fila local em SQLite
+
+O coordenador enfileira tarefas de descoberta (um distrito do Text Search ou
+uma área do Nearby Search). Qualquer número de workers, inclusive com chaves
+de API diferentes, reivindica tarefas com lease: se um worker morrer, a
+tarefa volta para a fila quando o lease expira. Uma tarefa que falha volta
+para a fila com o ponto de retomada (template, página e next_page_token).
+Cada local novo descoberto vira uma tarefa de detalhes, deduplicada por
+place_id. A fila usa SQLite em modo WAL e não pode ficar em um sistema de
+arquivos de rede: todos os workers rodam no mesmo host. No fim, o coordenador
+junta os registros por place_id, grava o SOR e incorpora ao histórico do
+planejador o rendimento das consultas enviado pelos workers.
+
+Uso:
+    python sharded_collector.py init              # enfileira a descoberta
+    python sharded_collector.py worker [--api-key CHAVE]   # em N terminais do mesmo host
+    python sharded_collector.py status
+    python sharded_collector.py merge             # grava o SOR (CSV/JSON)
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from get_google_places import LOCAL, SEARCH_AREAS, DataCollector
+from query_planner import QueryPlanner
+from raw_archive import RawArchive
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind);
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY,
+    place TEXT NOT NULL,
+    record TEXT
+);
+CREATE TABLE IF NOT EXISTS planner_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    applied INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class WorkQueue:
+    def __init__(self, path: str, lease_seconds: float = 300, max_attempts: int = 3):
+        """
+        Args:
+            path: Arquivo SQLite compartilhado entre coordenador e workers
+            lease_seconds: Tempo até uma tarefa reivindicada voltar para a fila
+            max_attempts: Tentativas antes de marcar a tarefa como 'failed'
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def enqueue(self, kind: str, key: str, payload: Dict) -> bool:
+        """
+        Enfileira uma tarefa; retorna False se (kind, key) já existir
+        """
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload) VALUES (?, ?, ?)",
+            (kind, key, json.dumps(payload, ensure_ascii=False)),
+        )
+        return cur.rowcount > 0
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Reivindica uma tarefa pendente (ou com lease expirado); detalhes têm prioridade
+        para que os registros fiquem prontos enquanto a descoberta continua
+        """
+        kinds = kinds or ["details", "textsearch", "nearbysearch"]
+        order = " ".join(f"WHEN '{k}' THEN {i}" for i, k in enumerate(kinds))
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                f"SELECT id, kind, key, payload, attempts FROM tasks "
+                f"WHERE kind IN ({','.join('?' * len(kinds))}) "
+                f"AND (status = 'pending' OR (status = 'leased' AND lease_until < ?)) "
+                f"ORDER BY CASE kind {order} END, id LIMIT 1",
+                (*kinds, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            task_id, kind, key, payload, attempts = row
+            if attempts >= self.max_attempts:
+                self.conn.execute("UPDATE tasks SET status = 'failed' WHERE id = ?", (task_id,))
+                self.conn.execute("COMMIT")
+                return self.claim(worker, kinds)
+            self.conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now + self.lease_seconds, task_id),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return {"id": task_id, "kind": kind, "key": key, "payload": json.loads(payload)}
+
+    def complete(self, task_id: int, worker: str, planner_events: Optional[List[Dict]] = None) -> bool:
+        """
+        Conclui a tarefa e envia o journal do planejador na mesma transação;
+        retorna False se o lease expirou e a tarefa já é de outro worker
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "UPDATE tasks SET status = 'done', lease_until = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                (task_id, worker),
+            )
+            if cur.rowcount:
+                self.add_planner_events(planner_events or [])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount > 0
+
+    def fail(self, task_id: int, worker: str, error: str, payload: Optional[Dict] = None) -> bool:
+        """
+        Devolve a tarefa para a fila (até max_attempts) registrando o erro e,
+        se informado, o payload com o ponto de retomada; retorna False se o
+        lease expirou e a tarefa já é de outro worker
+        """
+        sets = "status = 'pending', lease_until = NULL, error = ?"
+        params = [error]
+        if payload is not None:
+            sets += ", payload = ?"
+            params.append(json.dumps(payload, ensure_ascii=False))
+        cur = self.conn.execute(f"UPDATE tasks SET {sets} WHERE id = ? AND worker = ? AND status = 'leased'",
+                                (*params, task_id, worker))
+        return cur.rowcount > 0
+
+    def pending(self) -> int:
+        """
+        Tarefas ainda não concluídas (pendentes ou em andamento)
+        """
+        return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        counts = {}
+        for kind, status, n in self.conn.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = n
+        return counts
+
+    # ----------------- Locais -----------------
+
+    def known_place_ids(self) -> set:
+        return {pid for (pid,) in self.conn.execute("SELECT place_id FROM places")}
+
+    def add_places(self, places: List[Dict]) -> int:
+        """
+        Registra locais descobertos e enfileira seus detalhes; retorna quantos eram novos
+        """
+        new_places = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for place in places:
+                cur = self.conn.execute("INSERT OR IGNORE INTO places (place_id, place) VALUES (?, ?)",
+                                        (place["place_id"], json.dumps(place, ensure_ascii=False)))
+                if cur.rowcount:
+                    new_places += 1
+                    self.conn.execute("INSERT OR IGNORE INTO tasks (kind, key, payload) VALUES ('details', ?, '{}')",
+                                      (place["place_id"],))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return new_places
+
+    def place(self, place_id: str) -> Dict:
+        row = self.conn.execute("SELECT place FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return json.loads(row[0]) if row else {"place_id": place_id}
+
+    def save_record(self, place_id: str, record: Dict):
+        self.conn.execute("UPDATE places SET record = ? WHERE place_id = ?",
+                          (json.dumps(record, ensure_ascii=False), place_id))
+
+    def records(self) -> List[Dict]:
+        return [json.loads(r) for (r,) in self.conn.execute("SELECT record FROM places WHERE record IS NOT NULL ORDER BY rowid")]
+
+    # ----------------- Planejador -----------------
+
+    def add_planner_events(self, events: List[Dict]):
+        """
+        Envia ao coordenador o journal do planejador de um worker
+        """
+        self.conn.executemany("INSERT INTO planner_events (event) VALUES (?)",
+                              [(json.dumps(e, ensure_ascii=False),) for e in events])
+
+    def planner_events(self) -> List[tuple]:
+        """
+        Eventos ainda não incorporados ao histórico, como (id, evento)
+        """
+        return [(i, json.loads(e)) for i, e in
+                self.conn.execute("SELECT id, event FROM planner_events WHERE applied = 0 ORDER BY id")]
+
+    def mark_applied(self, last_id: int):
+        self.conn.execute("UPDATE planner_events SET applied = 1 WHERE id <= ?", (last_id,))
+
+
+# ----------------- Coordenador -----------------
+
+def init_tasks(queue: WorkQueue, collector: DataCollector) -> int:
+    """
+    Enfileira as tarefas de descoberta, na ordem de rendimento do planejador
+    """
+    added = 0
+    for distrito in collector.planner.order_districts(collector.district_list()):
+        added += queue.enqueue("textsearch", distrito, {"distrito": distrito})
+    for area in SEARCH_AREAS:
+        added += queue.enqueue("nearbysearch", area["name"], area)
+    return added
+
+
+def merge(queue: WorkQueue, collector: DataCollector):
+    """
+    Junta os registros de todos os workers (um por place_id), grava o SOR e
+    incorpora ao histórico do planejador o rendimento observado pelos workers
+    """
+    events = queue.planner_events()
+    if events:
+        collector.planner.replay([e for _, e in events])
+        collector.planner.save_stats()
+        queue.mark_applied(events[-1][0])
+        print(f"📈 {len(events)} eventos do planejador gravados em {collector.planner.stats_path}")
+
+    collector.results = queue.records()
+    print(f"🔗 {len(collector.results)} {LOCAL} únicos coletados pelos workers")
+    collector.save_to_json()
+    collector.save_to_csv()
+
+
+# ----------------- Worker -----------------
+
+def run_task(task: Dict, queue: WorkQueue, collector: DataCollector) -> List[Dict]:
+    """
+    Executa uma tarefa e retorna o journal do planejador a enviar na conclusão.
+    Levanta RuntimeError se alguma chamada à API falhar, para que a tarefa volte
+    para a fila; o ponto de retomada e o journal das chamadas que deram certo
+    ficam em task["payload"]["progress"]
+    """
+    if task["kind"] == "details":
+        record = collector.fetch_record(queue.place(task["key"]))
+        time.sleep(0.1)
+        if not record:
+            raise RuntimeError("detalhes vazios ou com status diferente de OK")
+        queue.save_record(task["key"], record)
+        return []
+
+    # Descoberta: o dicionário parte dos place_ids já conhecidos, para que o
+    # rendimento do planejador conte apenas locais novos para toda a coleta
+    known = queue.known_place_ids()
+    all_places = dict.fromkeys(known)
+    progress = task["payload"].setdefault("progress", {})
+    journal = collector.planner.journal
+    journal.clear()
+    failed = collector.failed_calls
+    try:
+        if task["kind"] == "textsearch":
+            collector.search_district(task["payload"]["distrito"], all_places, progress=progress)
+        else:
+            collector.search_area(task["payload"], all_places)
+    finally:
+        # Os locais obtidos antes de uma falha são mantidos; a retomada parte deles
+        new = queue.add_places([p for pid, p in all_places.items() if pid not in known])
+        print(f"  → {new} novos {LOCAL} enfileirados para detalhes")
+        progress["journal"] = progress.get("journal", []) + journal
+        journal.clear()
+    if collector.failed_calls > failed:
+        raise RuntimeError(f"{collector.failed_calls - failed} chamada(s) à API falharam")
+    return progress["journal"]
+
+
+def run_worker(queue: WorkQueue, collector: DataCollector, worker: str, idle_exit: float = 30):
+    """
+    Processa tarefas até a fila esvaziar (e ficar ociosa por idle_exit segundos)
+    """
+    done = 0
+    idle_since = None
+    while True:
+        task = queue.claim(worker)
+        if task is None:
+            if queue.pending() == 0:
+                idle_since = idle_since or time.time()
+                if time.time() - idle_since >= idle_exit:
+                    break
+            time.sleep(1)
+            continue
+        idle_since = None
+        try:
+            events = run_task(task, queue, collector)
+        except Exception as e:
+            print(f"Erro na tarefa {task['kind']} {task['key']}: {e}")
+            if not queue.fail(task["id"], worker, str(e), task["payload"]):
+                print(f"  Lease expirado: a tarefa {task['key']} já está com outro worker")
+            continue
+        # O journal só chega ao coordenador quando a tarefa é concluída
+        if queue.complete(task["id"], worker, events):
+            done += 1
+        else:
+            print(f"  Lease expirado: a tarefa {task['key']} já está com outro worker")
+    print(f"✅ Worker {worker} concluiu {done} tarefas")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["init", "worker", "status", "merge"])
+    ap.add_argument("--queue", default=os.getenv('WORK_QUEUE_FILE', f"{LOCAL}_work_queue.sqlite"),
+                    help="Arquivo SQLite da fila compartilhada")
+    ap.add_argument("--api-key", default=None, help="Chave da API deste worker (padrão: GOOGLE_API_KEY)")
+    ap.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    ap.add_argument("--lease", type=float, default=300, help="Segundos de lease por tarefa")
+    ap.add_argument("--idle-exit", type=float, default=30,
+                    help="Segundos sem tarefas pendentes antes de o worker encerrar")
+    ap.add_argument("--archive-dir", default=None,
+                    help="Arquivo de respostas brutas deste worker (padrão: {RAW_ARCHIVE_DIR}/{worker-id})")
+    ap.add_argument("--no-archive", action="store_true", help="Não arquiva as respostas brutas")
+    args = ap.parse_args()
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease)
+
+    if args.command == "status":
+        for kind, counts in queue.status().items():
+            print(f"{kind:<13} " + "  ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+        return
+
+    offline = args.command != "worker"
+    # Workers usam o histórico do planejador só para leitura (vários processos
+    # gravando o mesmo JSON se sobrescreveriam); o merge grava o que eles observaram
+    planner = QueryPlanner(os.getenv('QUERY_STATS_FILE', f"{LOCAL}_query_stats.json"),
+                           read_only=args.command == "worker")
+    # Cada worker grava no próprio subdiretório: o índice e os segmentos de um
+    # arquivo não suportam escritores concorrentes. O --rebuild lê todos
+    archive = None
+    if args.command == "worker" and not args.no_archive:
+        archive_dir = args.archive_dir or os.path.join(
+            os.getenv('RAW_ARCHIVE_DIR', f"{LOCAL}_raw_archive"), args.worker_id)
+        archive = RawArchive(archive_dir)
+    collector = DataCollector(planner=planner, archive=archive, offline=offline, api_key=args.api_key)
+
+    if args.command == "init":
+        print(f"📥 {init_tasks(queue, collector)} tarefas de descoberta enfileiradas em {args.queue}")
+    elif args.command == "merge":
+        merge(queue, collector)
+    else:
+        run_worker(queue, collector, args.worker_id, args.idle_exit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Serviço local (somente leitura) de consultas sobre os dados normalizados (SOT)
+
+Os CSVs normalizados (*_saida_unificada*) são carregados uma única vez em estruturas indexadas:
+grade espacial sobre lat/lon, índices hash por distrito, marca e
+business_status e ordenação prévia por rating. O índice é recarregado
+automaticamente quando um novo snapshot aparece no diretório.
+"""
+
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 0.01  # ~1,1 km em São Paulo
+HASH_COLUMNS = ("distrito_atualizado", "brand", "business_status")
+# Saída padrão do normalize_data.py e snapshots em resultados/
+DEFAULT_PATTERNS = ["*_saida_unificada*.csv", "resultados/*_saida_unificada*.csv"]
+
+
+def _brand_from_path(path: str) -> str:
+    """
+    Marca inferida do nome do arquivo ({ASK_THEME}_saida_unificada_SOT.csv)
+    """
+    return Path(path).stem.split("_")[0]
+
+
+def _clean(record: Dict) -> Dict:
+    return {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in record.items()}
+
+
+def load_snapshots(paths: List[str]) -> pd.DataFrame:
+    """
+    Concatena os snapshots SOT; para cada place_id mantém o registro do arquivo mais recente
+    """
+    frames = []
+    for path in sorted(paths, key=os.path.getmtime):
+        df = pd.read_csv(path, encoding="utf-8")
+        if "brand" not in df.columns:
+            df["brand"] = _brand_from_path(path)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["place_id", "latitude", "longitude", "rating", *HASH_COLUMNS])
+
+    df = pd.concat(frames, ignore_index=True)
+    if "place_id" in df.columns:
+        df = df.drop_duplicates("place_id", keep="last")
+    for col in ("latitude", "longitude", "rating", "total_ratings"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.reset_index(drop=True)
+
+
+class StoreIndex:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        # Registros materializados uma vez (NaN não é JSON válido)
+        self.records = [_clean(r) for r in df.to_dict("records")]
+        self.lat = df["latitude"].to_numpy(dtype=float)
+        self.lon = df["longitude"].to_numpy(dtype=float)
+
+        # Grade espacial: célula (i, j) -> linhas
+        valid = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        rows = np.flatnonzero(valid)
+        cells = np.stack([np.floor(self.lat[rows] / CELL_DEG), np.floor(self.lon[rows] / CELL_DEG)], axis=1).astype(int)
+        self.grid: Dict[tuple, np.ndarray] = {}
+        if len(rows):
+            uniq, inverse = np.unique(cells, axis=0, return_inverse=True)
+            order = np.argsort(inverse.ravel(), kind="stable")
+            bounds = np.searchsorted(inverse.ravel()[order], np.arange(len(uniq) + 1))
+            for n, (i, j) in enumerate(uniq):
+                self.grid[(int(i), int(j))] = rows[order[bounds[n]:bounds[n + 1]]]
+
+        # Índices hash
+        self.hash: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in HASH_COLUMNS:
+            if col in df.columns:
+                self.hash[col] = {str(k): np.asarray(v) for k, v in df.groupby(col, sort=False).indices.items()}
+
+        # Contagens pré-agregadas por combinação das colunas indexadas: /counts
+        # soma essas poucas linhas em vez de agrupar o DataFrame inteiro
+        keys = list(self.hash)
+        groups = df.groupby(keys, dropna=False, sort=False).size().reset_index(name="count") if keys else pd.DataFrame()
+        self.group_counts = [_clean(r) for r in groups.to_dict("records")]
+        self._group_keys = {col: groups[col].astype(str).to_numpy() for col in keys}
+
+        # Ordem decrescente de rating (NaN no final)
+        rating = df["rating"].to_numpy(dtype=float) if "rating" in df.columns else np.full(len(df), np.nan)
+        self.by_rating = np.argsort(np.where(np.isnan(rating), np.inf, -rating), kind="stable")
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    # ----------------- Consultas -----------------
+
+    def _rows(self, idx: np.ndarray, limit: Optional[int] = None) -> List[Dict]:
+        if limit is not None:
+            idx = idx[:limit]
+        return [dict(self.records[i]) for i in idx]
+
+    def filter_mask(self, **filters) -> np.ndarray:
+        """
+        Máscara booleana das linhas que atendem aos filtros exatos (ex.: brand='BurgerKing')
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for col, value in filters.items():
+            if value is None:
+                continue
+            if col not in self.hash:
+                raise ValueError(f"Coluna sem índice: {col}")
+            sub = np.zeros(len(self), dtype=bool)
+            sub[self.hash[col].get(str(value), [])] = True
+            mask &= sub
+        return mask
+
+    def bbox(self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, **filters) -> np.ndarray:
+        """
+        Linhas dentro do retângulo lat/lon
+        """
+        cands = [self.grid.get((i, j)) for i in range(int(np.floor(lat_min / CELL_DEG)), int(np.floor(lat_max / CELL_DEG)) + 1)
+                 for j in range(int(np.floor(lon_min / CELL_DEG)), int(np.floor(lon_max / CELL_DEG)) + 1)]
+        cands = [c for c in cands if c is not None]
+        if not cands:
+            return np.empty(0, dtype=int)
+        idx = np.concatenate(cands)
+        lat, lon = self.lat[idx], self.lon[idx]
+        idx = idx[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+        return idx[self.filter_mask(**filters)[idx]]
+
+    def radius(self, lat: float, lon: float, km: float, **filters) -> np.ndarray:
+        """
+        Linhas a até `km` quilômetros do ponto, ordenadas por distância
+        """
+        dlat = np.degrees(km / EARTH_RADIUS_KM)
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        idx = self.bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon, **filters)
+        dist = self.distance_km(lat, lon, idx)
+        keep = dist <= km
+        order = np.argsort(dist[keep], kind="stable")
+        return idx[keep][order]
+
+    def distance_km(self, lat: float, lon: float, idx: np.ndarray) -> np.ndarray:
+        p1, p2 = np.radians(lat), np.radians(self.lat[idx])
+        dp = p2 - p1
+        dl = np.radians(self.lon[idx] - lon)
+        a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def top_rated(self, k: int = 10, **filters) -> np.ndarray:
+        """
+        As k linhas de maior rating que atendem aos filtros
+        """
+        mask = self.filter_mask(**filters)
+        return self.by_rating[mask[self.by_rating]][:k]
+
+    def counts(self, by: List[str], **filters) -> List[Dict]:
+        """
+        Contagem de lojas por combinação de colunas (ex.: distrito e marca)
+        """
+        active = {col: value for col, value in filters.items() if value is not None}
+        if self._group_keys and set(by) | set(active) <= set(self._group_keys):
+            mask = np.ones(len(self.group_counts), dtype=bool)
+            for col, value in active.items():
+                mask &= self._group_keys[col] == str(value)
+            totals: Dict[tuple, int] = {}
+            for i in np.flatnonzero(mask):
+                group = self.group_counts[i]
+                key = tuple(group[col] for col in by)
+                totals[key] = totals.get(key, 0) + group["count"]
+            rows = [{**dict(zip(by, key)), "count": count} for key, count in totals.items()]
+            return sorted(rows, key=lambda r: r["count"], reverse=True)
+
+        sub = self.df[self.filter_mask(**filters)]
+        counts = sub.groupby(by, dropna=False).size().reset_index(name="count")
+        return [_clean(r) for r in counts.sort_values("count", ascending=False).to_dict("records")]
+
+
+class StoreQueryService:
+    def __init__(self, pattern=DEFAULT_PATTERNS, reload_interval: float = 5.0):
+        """
+        Args:
+            pattern: Glob (ou lista de globs) dos CSVs normalizados (ex.: 'resultados/*_saida_unificada*.csv')
+            reload_interval: Intervalo (segundos) de verificação de novos snapshots; 0 desativa
+        """
+        self.patterns = [pattern] if isinstance(pattern, str) else list(pattern)
+        self.reload_interval = reload_interval
+        self._signature = None
+        self.index = StoreIndex(load_snapshots([]))
+        self.reload()
+        if reload_interval > 0:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def _current_signature(self):
+        paths = sorted({p for pattern in self.patterns for p in glob.glob(pattern)})
+        return tuple((p, os.path.getmtime(p), os.path.getsize(p)) for p in paths)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Reconstrói o índice se algum snapshot mudou; a troca é atômica para as consultas em andamento
+        """
+        signature = self._current_signature()
+        if signature == self._signature and not force:
+            return False
+        self.index = StoreIndex(load_snapshots([p for p, _, _ in signature]))
+        self._signature = signature
+        print(f"🔄 Índice carregado: {len(self.index)} lojas de {len(signature)} arquivo(s)")
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Erro ao recarregar snapshots: {e}")
+
+    def query(self, endpoint: str, params: Dict[str, str]) -> Dict:
+        """
+        Executa uma consulta; mesma interface do servidor HTTP
+        """
+        index = self.index
+        filters = {col: params.get(col) for col in HASH_COLUMNS}
+        limit = int(params["limit"]) if "limit" in params else None
+
+        if endpoint == "radius":
+            idx = index.radius(float(params["lat"]), float(params["lon"]), float(params.get("km", 2)), **filters)
+            rows = index._rows(idx, limit)
+            for row, dist in zip(rows, index.distance_km(float(params["lat"]), float(params["lon"]), idx[:len(rows)])):
+                row["distance_km"] = round(float(dist), 3)
+        elif endpoint == "bbox":
+            idx = index.bbox(float(params["lat_min"]), float(params["lon_min"]),
+                             float(params["lat_max"]), float(params["lon_max"]), **filters)
+            rows = index._rows(idx, limit)
+        elif endpoint == "district":
+            idx = np.flatnonzero(index.filter_mask(**filters))
+            rows = index._rows(idx, limit)
+        elif endpoint == "top":
+            idx = index.top_rated(int(params.get("k", 10)), **filters)
+            rows = index._rows(idx)
+        elif endpoint == "counts":
+            idx = index.counts(params.get("by", "distrito_atualizado,brand").split(","), **filters)
+            rows = idx[:limit] if limit is not None else idx
+        else:
+            raise ValueError(f"Endpoint desconhecido: {endpoint}")
+        return {"total": len(idx), "results": rows}
+
+
+def make_handler(service: StoreQueryService):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                status, body = 200, service.query(url.path.strip("/"), params)
+            except (KeyError, ValueError) as e:
+                status, body = 400, {"error": str(e)}
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pattern", nargs="+", default=DEFAULT_PATTERNS,
+                    help="Globs dos CSVs normalizados (padrão: " + " ".join(DEFAULT_PATTERNS) + ")")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--reload-interval", type=float, default=5.0, help="Segundos entre verificações de novos snapshots (0 desativa)")
+    args = ap.parse_args()
+
+    service = StoreQueryService(args.pattern, args.reload_interval)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 Servindo em http://{args.host}:{args.port} (radius, bbox, district, top, counts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
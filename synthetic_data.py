@@ -0,0 +1,199 @@
+"""
+Gerador de registros sintéticos da Google Places API em escala de São Paulo
+
+Os endereços usam os distritos oficiais (DISTRITOS_SP), os bairros de
+NEIGHBORHOOD_TO_DISTRITO e as cidades de CIDADES_GRANDE_SP, com ruído de
+acentuação e formatação, para exercitar a normalização como os dados reais.
+A geração é vetorizada e feita em blocos, permitindo de 10³ a 10⁷ registros.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from normalize_data import CIDADES_GRANDE_SP, DISTRITOS_SP, NEIGHBORHOOD_TO_DISTRITO, _norm
+
+BRANDS = ["McDonald's", "Burger King", "Bob's", "Habib's"]
+STREETS = ["Av. Paulista", "R. Augusta", "Av. Rebouças", "R. da Consolação", "Av. Brigadeiro Faria Lima",
+           "Av. Sapopemba", "R. Vergueiro", "Av. Celso Garcia", "Estr. do M'Boi Mirim", "Av. Inajar de Souza",
+           "R. Teodoro Sampaio", "Av. Aricanduva", "Av. Sen. Teotônio Vilela", "R. Voluntários da Pátria"]
+UNKNOWN_BAIRROS = ["Vila Nova", "Jardim das Flores", "Parque Industrial", "Conjunto Habitacional", "Centro Comercial"]
+CITY_VARIANTS = ["São Paulo - SP", "Sao Paulo - SP", "São Paulo - State of São Paulo", "SÃO PAULO - SP"]
+STATUS = ["OPERATIONAL", "CLOSED_TEMPORARILY", "CLOSED_PERMANENTLY"]
+
+# Bounding box do município de São Paulo (centroides sintéticos dos distritos)
+SP_BOUNDS = {"lat_min": -23.90, "lat_max": -23.36, "lng_min": -46.82, "lng_max": -46.37}
+
+
+def _variants(name: str) -> List[str]:
+    """
+    Grafias de um nome com ruído: original, sem acento, maiúsculas, minúsculas e espaços extras
+    """
+    plain = _norm(name).title()
+    return [name, plain, name.upper(), name.lower(), f" {name}  "]
+
+
+class SyntheticPlaces:
+    def __init__(self, seed: int = 42, normalized: bool = False,
+                 p_neighborhood: float = 0.15, p_unknown: float = 0.08, p_other_city: float = 0.05):
+        """
+        Args:
+            seed: Semente do gerador
+            normalized: Se True, inclui as colunas SOT (distrito_atualizado etc.) com o distrito verdadeiro
+            p_neighborhood: Fração de endereços com bairro (alias) em vez do distrito
+            p_unknown: Fração de endereços com bairro desconhecido
+            p_other_city: Fração de lojas em outras cidades da Grande SP
+        """
+        self.rng = np.random.default_rng(seed)
+        self.normalized = normalized
+        self.p = np.array([1 - p_neighborhood - p_unknown, p_neighborhood, p_unknown])
+        self.p_other_city = p_other_city
+
+        # Tabelas de grafias: (texto com ruído, distrito verdadeiro)
+        self.dist_text, self.dist_true = self._table([(d, d) for d in DISTRITOS_SP])
+        self.nbh_text, self.nbh_true = self._table(list(NEIGHBORHOOD_TO_DISTRITO.items()))
+        self.unk_text = np.array(UNKNOWN_BAIRROS, dtype=object)
+        self.city_text = np.array([_variants(c.title())[i] for c in CIDADES_GRANDE_SP for i in (0, 2)], dtype=object)
+
+        centroid_rng = np.random.default_rng(seed + 1)
+        self.centroids = {
+            d: (centroid_rng.uniform(SP_BOUNDS["lat_min"], SP_BOUNDS["lat_max"]),
+                centroid_rng.uniform(SP_BOUNDS["lng_min"], SP_BOUNDS["lng_max"]))
+            for d in set(DISTRITOS_SP) | set(NEIGHBORHOOD_TO_DISTRITO.values())
+        }
+        self._counter = 0
+
+    @staticmethod
+    def _table(pairs):
+        text, true = [], []
+        for name, distrito in pairs:
+            for v in _variants(name):
+                text.append(v)
+                true.append(distrito)
+        return np.array(text, dtype=object), np.array(true, dtype=object)
+
+    def frame(self, n: int) -> pd.DataFrame:
+        """
+        Gera um DataFrame com n registros no esquema SOR (ou SOT, se normalized=True)
+        """
+        rng = self.rng
+        kind = rng.choice(3, size=n, p=self.p)
+
+        bairro = np.empty(n, dtype=object)
+        distrito = np.empty(n, dtype=object)
+        for k, (text, true) in enumerate([(self.dist_text, self.dist_true), (self.nbh_text, self.nbh_true),
+                                          (self.unk_text, np.full(len(self.unk_text), "Não Identificado", dtype=object))]):
+            mask = kind == k
+            pick = rng.integers(0, len(text), size=mask.sum())
+            bairro[mask] = text[pick]
+            distrito[mask] = true[pick]
+
+        other_city = rng.random(n) < self.p_other_city
+        city = np.array(CITY_VARIANTS, dtype=object)[rng.choice(len(CITY_VARIANTS), size=n, p=[0.7, 0.15, 0.1, 0.05])]
+        city[other_city] = self.city_text[rng.integers(0, len(self.city_text), size=other_city.sum())] + " - SP"
+
+        street = np.array(STREETS, dtype=object)[rng.integers(0, len(STREETS), size=n)]
+        number = rng.integers(1, 5000, size=n).astype(str).astype(object)
+        cep = pd.Series(rng.integers(1000, 9999, size=n)).astype(str).str.zfill(5) + "-" + \
+            pd.Series(rng.integers(0, 999, size=n)).astype(str).str.zfill(3)
+        address = pd.Series(street) + ", " + number + " - " + pd.Series(bairro) + ", " + pd.Series(city) + ", " + cep + ", Brazil"
+
+        # Coordenadas em torno do centroide do distrito verdadeiro (ou aleatórias se desconhecido)
+        lat = rng.uniform(SP_BOUNDS["lat_min"], SP_BOUNDS["lat_max"], size=n)
+        lng = rng.uniform(SP_BOUNDS["lng_min"], SP_BOUNDS["lng_max"], size=n)
+        known = distrito != "Não Identificado"
+        cents = np.array([self.centroids[d] for d in distrito[known]]).reshape(-1, 2)
+        lat[known] = cents[:, 0] + rng.normal(0, 0.01, size=known.sum())
+        lng[known] = cents[:, 1] + rng.normal(0, 0.01, size=known.sum())
+
+        # Campo 'distrito' do coletor: às vezes acerta, às vezes não identifica
+        guessed = np.where((kind == 0) & (rng.random(n) < 0.6), distrito, "Não Identificado")
+
+        ids = np.arange(self._counter, self._counter + n)
+        self._counter += n
+        df = pd.DataFrame({
+            "place_id": pd.Series(ids).map("SYN{:012d}".format),
+            "name": np.array(BRANDS, dtype=object)[rng.integers(0, len(BRANDS), size=n)],
+            "address": address,
+            "distrito": guessed,
+            "latitude": lat.round(7),
+            "longitude": lng.round(7),
+            "phone": "N/A",
+            "website": "N/A",
+            "rating": np.clip(rng.normal(4.0, 0.4, size=n), 1, 5).round(1),
+            "total_ratings": rng.lognormal(6, 1.2, size=n).astype(int),
+            "price_level": rng.integers(1, 3, size=n, endpoint=True),
+            "business_status": np.array(STATUS, dtype=object)[rng.choice(3, size=n, p=[0.9, 0.05, 0.05])],
+            "is_open_now": rng.random(n) < 0.7,
+            "types": "establishment, food, point_of_interest, restaurant",
+            "opening_hours": "N/A",
+            "opening_hours_bitmap": "N/A",
+            "photos_count": rng.integers(0, 10, size=n, endpoint=True),
+            "reviews_count": rng.integers(0, 5, size=n, endpoint=True),
+            "delivery": rng.random(n) < 0.8,
+            "dine_in": rng.random(n) < 0.9,
+            "takeout": rng.random(n) < 0.9,
+            "serves_breakfast": "N/A",
+            "serves_dinner": True,
+            "serves_lunch": True,
+            "wheelchair_accessible_entrance": rng.random(n) < 0.6,
+        })
+        if self.normalized:
+            resolved = known & ~other_city
+            df["distrito_atualizado"] = np.where(resolved, distrito, "Não Identificado")
+            df["confianca_distrito"] = np.where(resolved, "alta", "baixa")
+            df["metodo_distrito"] = np.where(resolved, "address", "nao_identificado")
+        return df
+
+    def frames(self, n: int, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Gera n registros em blocos de até chunk_size
+        """
+        for start in range(0, n, chunk_size):
+            yield self.frame(min(chunk_size, n - start))
+
+    def records(self, n: int, chunk_size: int = 100_000) -> Iterator[dict]:
+        for df in self.frames(n, chunk_size):
+            yield from df.to_dict("records")
+
+
+def write(path: str, n: int, generator: SyntheticPlaces, chunk_size: int = 100_000):
+    """
+    Grava n registros em NDJSON (.ndjson/.jsonl) ou CSV, bloco a bloco
+    """
+    path = Path(path)
+    csv = path.suffix == ".csv"
+    with open(path, "w", encoding="utf-8") as f:
+        for i, df in enumerate(generator.frames(n, chunk_size)):
+            if csv:
+                df.to_csv(f, index=False, header=(i == 0))
+            else:
+                for record in df.to_dict("records"):
+                    f.write(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo não serializável: {type(value)}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=float, required=True, help="Número de registros (ex.: 1e6)")
+    ap.add_argument("--output", required=True, help="Arquivo de saída (.ndjson/.jsonl ou .csv)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--normalized", action="store_true", help="Inclui as colunas SOT (distrito_atualizado etc.)")
+    ap.add_argument("--chunk-size", type=int, default=100_000)
+    args = ap.parse_args()
+
+    write(args.output, int(args.rows), SyntheticPlaces(args.seed, args.normalized), args.chunk_size)
+    print(f"{int(args.rows)} registros sintéticos gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()